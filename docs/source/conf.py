@@ -122,7 +122,6 @@ intersphinx_mapping = {
     "sigmaepsilon.core": (r"https://sigmaepsiloncore.readthedocs.io/en/latest/", None),
     "sigmaepsilon.math": (r"https://sigmaepsilonmath.readthedocs.io/en/latest/", None),
     "sigmaepsilon.mesh": (r"https://sigmaepsilonmesh.readthedocs.io/en/latest/", None),
-    "linkeddeepdict": (r"https://linkeddeepdict.readthedocs.io/en/latest/", None),
 }
 
 # -- bibtex configuration -------------------------------------------------
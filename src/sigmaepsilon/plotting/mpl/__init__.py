@@ -1,11 +1,17 @@
-from .parallel import parallel, aligned_parallel
+from .parallel import parallel, aligned_parallel, render_many
 from .d2 import plot_triangles_2d
 from .triplot import triplot
 
-__all__ = ["parallel", "aligned_parallel", "plot_triangles_2d", "triplot"]
+__all__ = [
+    "parallel",
+    "aligned_parallel",
+    "render_many",
+    "plot_triangles_2d",
+    "triplot",
+]
 
 import importlib.metadata
 
 __pkg_name__ = "sigmaepsilon.plotting.mpl"
 __version__ = importlib.metadata.version(__pkg_name__)
-__description__ = "Utilities for plotting with matplotlib."
\ No newline at end of file
+__description__ = "Utilities for plotting with matplotlib."
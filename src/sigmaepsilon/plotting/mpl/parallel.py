@@ -1,21 +1,41 @@
 # -*- coding: utf-8 -*-
-from typing import Iterable, TypeVar, Hashable, Union
+from typing import (
+    Iterable,
+    TypeVar,
+    Hashable,
+    Union,
+    Any,
+    Dict,
+    Callable,
+    List,
+    Optional,
+)
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from io import BytesIO
 
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.path import Path
-from matplotlib.patches import PathPatch
+from matplotlib.collections import PathCollection, LineCollection
 import matplotlib.gridspec as gridspec
 from matplotlib.widgets import Slider
 from matplotlib.figure import Figure
+from matplotlib.lines import TICKLEFT, TICKRIGHT
+from matplotlib.ticker import MaxNLocator, ScalarFormatter
+from matplotlib.transforms import blended_transform_factory, offset_copy
+from matplotlib import rcParams
 import numpy as np
 from numpy import ndarray
+from numba import njit, prange
 
-from linkeddeepdict import LinkedDeepDict
 from sigmaepsilon.core.formatting import float_to_str_sig as str_sig
 
 
-__all__ = ["parallel", "aligned_parallel"]
+__all__ = ["parallel", "aligned_parallel", "render_many"]
+
+__cache = True
 
 
 TScalar = TypeVar("TScalar", int, float, complex)
@@ -25,6 +45,55 @@ TRealVector = Iterable[TReal]
 TColor = TypeVar("TColor", str, TRealVector)
 
 
+@njit(nogil=True, cache=__cache)
+def _interp1(y: float, xs: ndarray, ys: ndarray) -> float:
+    """
+    Linear interpolation of the data points `(xs, ys)` at `y`, where `xs`
+    is sorted in ascending order. Values outside the range of `xs` are
+    clamped to the first and last value of `ys`.
+    """
+    i = np.searchsorted(xs, y)
+    if i == 0:
+        return ys[0]
+    if i >= xs.size:
+        return ys[-1]
+    t = (y - xs[i - 1]) / (xs[i] - xs[i - 1])
+    return ys[i - 1] + t * (ys[i] - ys[i - 1])
+
+
+@njit(nogil=True, parallel=True, cache=__cache)
+def _bezier_vertices(zs: ndarray, xs: ndarray, out: ndarray) -> ndarray:
+    """
+    Fills `out` with the control vertices of the bezier curves of a parallel
+    plot. Every value in `zs` is repeated three times, except the first and
+    last one of every record, which are repeated twice.
+    """
+    N = zs.shape[0]
+    nV = xs.shape[0]
+    for j in prange(N):
+        for k in range(nV):
+            out[j, k, 0] = xs[k]
+            out[j, k, 1] = zs[j, (k + 1) // 3]
+    return out
+
+
+@dataclass
+class _PlotEntry:
+    """
+    Data and artists of one axis of an aligned parallel plot.
+    """
+
+    values: ndarray
+    vmin: float
+    vmax: float
+    ax: Optional[Any] = None
+    text: Optional[Any] = None
+    hline: Optional[Any] = None
+    lines: Optional[Any] = None
+    xdata: Optional[ndarray] = None
+    ydata: Optional[ndarray] = None
+
+
 def parallel(
     data: Union[dict, list, ndarray],
     *,
@@ -81,13 +150,15 @@ def parallel(
     if isinstance(data, dict):
         if labels is None:
             labels = list(data.keys())
-        ys = np.dstack(list(data.values()))[0]
+        ys = np.column_stack(list(data.values()))
     elif isinstance(data, np.ndarray):
         assert labels is not None
         ys = data.T
     elif isinstance(data, Iterable):
         assert labels is not None
-        ys = np.dstack(data)[0]
+        if not isinstance(data, (list, tuple)):
+            data = list(data)
+        ys = np.asarray(data, dtype=float).T
     else:
         raise TypeError("Invalid data type!")
 
@@ -105,12 +176,9 @@ def parallel(
         ranges = np.array(ranges)
 
     # make sure that upper and lower ranges are not equal
-    for i in range(nY):
-        rmin, rmax = ranges[i]
-        if abs(rmin - rmax) < 1e-12:
-            rmin -= 1.0
-            rmax += 1.0
-            ranges[i] = [rmin, rmax]
+    equal = np.abs(ranges[:, 1] - ranges[:, 0]) < 1e-12
+    ranges[equal, 0] -= 1.0
+    ranges[equal, 1] += 1.0
     ymins = ranges[:, 0]
     ymaxs = ranges[:, 1]
 
@@ -120,19 +188,90 @@ def parallel(
     dys = ymaxs - ymins
 
     # transform all data to be compatible with the main axis
-    zs = np.zeros_like(ys)
-    zs[:, 0] = ys[:, 0]
-    zs[:, 1:] = (ys[:, 1:] - ymins[1:]) / dys[1:] * dys[0] + ymins[0]
-
-    axes = [host] + [host.twinx() for i in range(nY - 1)]
-    for i, ax in enumerate(axes):
-        ax.set_ylim(ymins[i], ymaxs[i])
-        ax.spines["top"].set_visible(False)
-        ax.spines["bottom"].set_visible(False)
-        if ax != host:
-            ax.spines["left"].set_visible(False)
-            ax.yaxis.set_ticks_position("right")
-            ax.spines["right"].set_position(("axes", i / (nY - 1)))
+    scale = np.empty(nY)
+    offset = np.empty(nY)
+    scale[0] = 1.0
+    offset[0] = 0.0
+    scale[1:] = dys[0] / dys[1:]
+    offset[1:] = ymins[0] - ymins[1:] * scale[1:]
+    zs = ys * scale + offset
+
+    host.set_ylim(ymins[0], ymaxs[0])
+    host.spines["top"].set_visible(False)
+    host.spines["bottom"].set_visible(False)
+
+    # The rest of the vertical axes are drawn directly on the host axis
+    # instead of using twin axes. The spines are positioned in axes coordinates,
+    # the ticks are transformed to the data coordinates of the host axis.
+    if nY > 1:
+        trans = blended_transform_factory(host.transAxes, host.transData)
+        # ticks and labels follow the rc settings like on a right-hand y axis
+        tickdir = rcParams["ytick.direction"]
+        tickmarker = {"in": TICKLEFT, "out": TICKRIGHT, "inout": "_"}[tickdir]
+        tickpad = {"in": 0.0, "out": 1.0, "inout": 0.5}[tickdir]
+        labelpad = tickpad * rcParams["ytick.major.size"] + rcParams["ytick.major.pad"]
+        labelcolor = rcParams["ytick.labelcolor"]
+        if labelcolor == "inherit":
+            labelcolor = rcParams["ytick.color"]
+        labeltrans = offset_copy(trans, fig=fig, x=labelpad, units="points")
+        locator = MaxNLocator(
+            nbins=host.yaxis.get_tick_space(), steps=[1, 2, 2.5, 5, 10]
+        )
+        xpos = np.arange(1, nY) / (nY - 1)
+        spines = LineCollection(
+            [[(x, 0), (x, 1)] for x in xpos],
+            colors=rcParams["axes.edgecolor"],
+            linewidths=rcParams["axes.linewidth"],
+            transform=host.transAxes,
+            zorder=2.5,
+        )
+        host.add_collection(spines, autolim=False)
+        tick_x, tick_y = [], []
+        for i, x in zip(range(1, nY), xpos):
+            ticks = locator.tick_values(ymins[i], ymaxs[i])
+            ticks = ticks[(ticks >= ymins[i]) & (ticks <= ymaxs[i])]
+            # the labels are formatted the same way as on the host axis
+            formatter = ScalarFormatter()
+            formatter.create_dummy_axis()
+            formatter.axis.set_view_interval(ymins[i], ymaxs[i])
+            ticklabels = formatter.format_ticks(ticks)
+            offset_text = formatter.get_offset()
+            if offset_text:
+                host.text(
+                    x,
+                    1.0,
+                    offset_text,
+                    transform=host.transAxes,
+                    ha="left",
+                    va="bottom",
+                    fontsize=rcParams["ytick.labelsize"],
+                    color=labelcolor,
+                )
+            zticks = ticks * scale[i] + offset[i]
+            for z, lbl in zip(zticks, ticklabels):
+                host.text(
+                    x,
+                    z,
+                    lbl,
+                    transform=labeltrans,
+                    ha="left",
+                    va="center",
+                    fontsize=rcParams["ytick.labelsize"],
+                    color=labelcolor,
+                )
+            tick_x.append(np.full(len(zticks), x))
+            tick_y.append(zticks)
+        host.plot(
+            np.concatenate(tick_x),
+            np.concatenate(tick_y),
+            transform=trans,
+            linestyle="none",
+            marker=tickmarker,
+            markersize=rcParams["ytick.major.size"],
+            markeredgewidth=rcParams["ytick.major.width"],
+            color=rcParams["ytick.color"],
+            clip_on=False,
+        )
 
     host.set_xlim(0, nY - 1)
     host.set_xticks(range(nY))
@@ -143,32 +282,28 @@ def parallel(
     if title is not None:
         host.set_title(title, fontsize=12)
 
-    for j in range(N):
-        if not bezier:
-            # to just draw straight lines between the axes:
-            host.plot(range(nY), zs[j, :], c=colors[j], lw=lw)
-        else:
-            # create bezier curves
-            # for each axis, there will a control vertex at the point itself, one at 1/3rd towards the previous and one
-            #   at one third towards the next axis; the first and last axis have one less control vertex
-            # x-coordinate of the control vertices: at each integer (for the axes) and two inbetween
-            # y-coordinate: repeat every point three times, except the first and last only twice
-            verts = list(
-                zip(
-                    [
-                        x
-                        for x in np.linspace(
-                            0, len(ys) - 1, len(ys) * 3 - 2, endpoint=True
-                        )
-                    ],
-                    np.repeat(zs[j, :], 3)[1:-1],
-                )
-            )
-            # for x,y in verts: host.plot(x, y, 'go') # to show the control points of the beziers
-            codes = [Path.MOVETO] + [Path.CURVE4 for _ in range(len(verts) - 1)]
-            path = Path(verts, codes)
-            patch = PathPatch(path, facecolor="none", lw=lw, edgecolor=colors[j])
-            host.add_patch(patch)
+    if not bezier:
+        # to just draw straight lines between the axes:
+        segs = np.empty((N, nY, 2))
+        segs[:, :, 0] = np.arange(nY)
+        segs[:, :, 1] = zs
+        lc = LineCollection(segs, colors=colors, linewidths=lw)
+        host.add_collection(lc)
+    else:
+        # create bezier curves
+        # for each axis, there will a control vertex at the point itself, one at 1/3rd towards the previous and one
+        #   at one third towards the next axis; the first and last axis have one less control vertex
+        # x-coordinate of the control vertices: at each integer (for the axes) and two inbetween
+        # y-coordinate: repeat every point three times, except the first and last only twice
+        xs = np.linspace(0, nY - 1, nY * 3 - 2, endpoint=True)
+        codes = [Path.MOVETO] + [Path.CURVE4] * (xs.size - 1)
+        verts = np.empty((N, xs.size, 2))
+        _bezier_vertices(zs, xs, verts)
+        # for x,y in verts[j]: host.plot(x, y, 'go') # to show the control points of the beziers
+        paths = [Path(verts[j], codes) for j in range(N)]
+        # all curves are drawn by a single artist
+        pc = PathCollection(paths, facecolors="none", edgecolors=colors, linewidths=lw)
+        host.add_collection(pc)
 
     if return_figure:
         return fig
@@ -253,7 +388,6 @@ def aligned_parallel(
     fig = plt.figure(**kwargs)
     suptitle = "" if suptitle is None else suptitle
     fig.suptitle(suptitle)
-    plotdata = LinkedDeepDict()
     axcolor = "lightgoldenrodyellow"
     ymin, ymax = np.min(datapos), np.max(datapos)
     if y is None:
@@ -272,26 +406,24 @@ def aligned_parallel(
     if isinstance(data, dict):
         if labels is None:
             labels = list(data.keys())
+        values = np.column_stack([data[lbl] for lbl in labels])
     elif isinstance(data, np.ndarray):
         nData = data.shape[1]
         if labels is None:
             labels = list(map(str, range(nData)))
+        values = data
         data = {labels[i]: data[:, i] for i in range(nData)}
-    for lbl in labels:
-        plotdata[lbl]["values"] = data[lbl]
 
     # set min and max values
-    _min, _max = [], []
-    for lbl in labels:
-        plotdata[lbl]["min"] = np.min(data[lbl])
-        plotdata[lbl]["max"] = np.max(data[lbl])
-        _min.append(plotdata[lbl]["min"])
-        _max.append(plotdata[lbl]["max"])
+    mins = values.min(axis=0)
+    maxs = values.max(axis=0)
+    plotdata: Dict[Hashable, _PlotEntry] = {
+        lbl: _PlotEntry(values=data[lbl], vmin=mins[i], vmax=maxs[i])
+        for i, lbl in enumerate(labels)
+    }
     # set global min and max
-    vmin = np.min(_min)
-    vmax = np.max(_max)
-    del _min
-    del _max
+    vmin = mins.min()
+    vmax = maxs.max()
 
     # setting up figure layout
     nData = len(labels)
@@ -311,6 +443,10 @@ def aligned_parallel(
         left=0.1,
     )
 
+    # tick labels of the vertical axis
+    if yticks is not None:
+        yticklabels = [str_sig(val, sig=3) for val in yticks]
+
     # create axes
     for i in range(nData):
         plotid = int("{}{}{}".format(1, nAxes, i + 1))
@@ -322,31 +458,59 @@ def aligned_parallel(
         if i == 0:
             if yticks is not None:
                 ax.set_yticks(yticks)
-                ax.set_yticklabels([str_sig(val, sig=3) for val in yticks])
+                ax.set_yticklabels(yticklabels)
         else:
             ax.set_yticks([])
             ax.set_yticklabels([])
-        hline = ax.axhline(y=y0, color="#d62728", linewidth=1)
+        # with a slider, these are redrawn using blitting
+        (hline,) = ax.plot(
+            [0, 1],
+            [y0, y0],
+            transform=blended_transform_factory(ax.transAxes, ax.transData),
+            color="#d62728",
+            linewidth=1,
+            animated=slider,
+        )
         bbox = dict(boxstyle="round", ec="black", fc="yellow", alpha=0.8)
         txt = ax.text(
-            0.0, 0.0, "NaN", size=10, ha="center", va="center", visible=False, bbox=bbox
+            0.0,
+            0.0,
+            "NaN",
+            size=10,
+            ha="center",
+            va="center",
+            visible=False,
+            bbox=bbox,
+            animated=slider,
         )
         # horizontal lines
-        ax.axhline(y=yticks[0], color="black", linewidth=0.5, linestyle="-")
-        ax.axhline(y=yticks[-1], color="black", linewidth=0.5, linestyle="-")
-        for hl in hlines:
-            ax.axhline(y=hl, color="black", linewidth=0.5, linestyle="-")
+        hlist = [yticks[0], yticks[-1]] + list(hlines)
+        hlc = LineCollection(
+            [[(0, hl), (1, hl)] for hl in hlist],
+            colors="black",
+            linewidths=0.5,
+            linestyles="-",
+            transform=blended_transform_factory(ax.transAxes, ax.transData),
+        )
+        ax.add_collection(hlc, autolim=False)
         # a vertical lines
-        for vl in vlines:
-            ax.axvline(x=vl, color="black", linewidth=0.5, linestyle="-")
+        if len(vlines) > 0:
+            vlc = LineCollection(
+                [[(vl, 0), (vl, 1)] for vl in vlines],
+                colors="black",
+                linewidths=0.5,
+                linestyles="-",
+                transform=blended_transform_factory(ax.transData, ax.transAxes),
+            )
+            ax.add_collection(vlc, autolim=False)
         # store objects
-        plotdata[labels[i]]["ax"] = ax
-        plotdata[labels[i]]["text"] = txt
-        plotdata[labels[i]]["hline"] = hline
+        plotdata[labels[i]].ax = ax
+        plotdata[labels[i]].text = txt
+        plotdata[labels[i]].hline = hline
 
     # create slider
     if slider:
-        sliderax = fig.add_subplot(spec[0, nAxes - 1], fc=axcolor)
+        sliderax = fig.add_subplot(spec[0, nAxes - 1], fc=axcolor, animated=True)
         """sliderax.patch.set_edgecolor('black')
         sliderax.patch.set_linewidth('1.0')
         sliderax.patch.zorder = 10"""
@@ -361,6 +525,7 @@ def aligned_parallel(
             closedmin=True,
             closedmax=True,
         )  # track_color=axcolor, color=axcolor
+        slider_.drawon = False  # the figure is updated using blitting
         """slider_rect = slider_.track
         s_xy = slider_rect.get_xy() 
         s_w = slider_rect.get_width() 
@@ -368,15 +533,11 @@ def aligned_parallel(
         sliderax.add_patch(Rectangle(s_xy, s_w, s_h, fill=False, ec='k'))"""
 
     def _approx_at_y(y: float, plotkey: Hashable):
-        lines2D = plotdata[plotkey]["lines"]
-        values = lines2D.get_xdata()
-        locations = lines2D.get_ydata()
-        return np.interp(y, locations, values)
+        return _interp1(y, plotdata[plotkey].ydata, plotdata[plotkey].xdata)
 
     def _set_yval(y):
         for axkey in plotdata.keys():
-            if "hline" in plotdata[axkey]:
-                plotdata[axkey]["hline"].set_ydata(y)
+            plotdata[axkey].hline.set_ydata([y, y])
             v_at_y = _approx_at_y(y, axkey)
             txtparams = {
                 "visible": True,
@@ -384,35 +545,76 @@ def aligned_parallel(
                 "y": y,
                 "text": str_sig(v_at_y, sig=4),
             }
-            plotdata[axkey]["text"].update(txtparams)
-        fig.canvas.draw_idle()
+            plotdata[axkey].text.update(txtparams)
+        if slider:
+            _blit()
+        else:
+            fig.canvas.draw_idle()
 
     def _update_slider(y=None):
         if y is None:
-            y = slider.val
+            y = slider_.val
         _set_yval(y)
 
-    def _set_xlim(axs: mpl.axes, vmin: float, vmax: float):
+    def _animated_artists() -> list:
+        artists = []
+        for axkey in plotdata.keys():
+            artists.append(plotdata[axkey].hline)
+            artists.append(plotdata[axkey].text)
+        artists.append(sliderax)
+        return artists
+
+    def _on_draw(event):
+        # Store the static background of the figure after each full redraw,
+        # then add the animated artists, which are not drawn by the figure.
+        nonlocal background
+        canvas = event.canvas
+        if getattr(canvas, "supports_blit", False) and not canvas.is_saving():
+            background = canvas.copy_from_bbox(fig.bbox)
+        for artist in _animated_artists():
+            artist.draw(event.renderer)
+
+    def _on_resize(event):
+        nonlocal background
+        background = None
+
+    def _blit():
+        canvas = fig.canvas
+        if background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(background)
+        for artist in _animated_artists():
+            fig.draw_artist(artist)
+        canvas.blit(fig.bbox)
+
+    def _set_xlim(axs: mpl.axes, vmin: float, vmax: float, labels: Iterable = None):
         voffset = (vmax - vmin) * xoffset
         if abs(vmin - vmax) > 1e-7:
             axs.set_xlim(vmin - voffset, vmax + voffset)
         xticks = [vmin, vmax]
         axs.set_xticks(xticks)
+        if labels is None:
+            labels = [str_sig(val, sig=3) for val in xticks]
         rotation = kwargs.get("rotation", xticksrotation)
-        axs.set_xticklabels([str_sig(val, sig=3) for val in xticks], rotation=rotation)
+        axs.set_xticklabels(labels, rotation=rotation)
 
     def _set_ylim(axs: mpl.axes, vmin: float, vmax: float):
         voffset = (vmax - vmin) * yoffset
         axs.set_ylim(vmin - voffset, vmax + voffset)
 
     # plot axes
+    datapos_order = np.argsort(datapos, kind="stable")
+    datapos_sorted = np.asarray(datapos, dtype=float)[datapos_order]
+    if sharelimits == True:
+        shared_labels = [str_sig(val, sig=3) for val in [vmin, vmax]]
     for i, axkey in enumerate(plotdata.keys()):
-        axis = plotdata[axkey]["ax"]
+        axis = plotdata[axkey].ax
         # set limits
         if sharelimits == True:
-            _set_xlim(axis, vmin, vmax)
+            _set_xlim(axis, vmin, vmax, shared_labels)
         else:
-            _set_xlim(axis, plotdata[axkey]["min"], plotdata[axkey]["max"])
+            _set_xlim(axis, plotdata[axkey].vmin, plotdata[axkey].vmax)
         _set_ylim(axis, ymin, ymax)
         # set labels
         if texlabels is not None:
@@ -420,13 +622,94 @@ def aligned_parallel(
         else:
             axis.set_title(str(axkey))
         # plot
-        lines = axis.plot(plotdata[axkey]["values"], datapos, picker=5)[0]
-        plotdata[axkey]["lines"] = lines
+        lines = axis.plot(plotdata[axkey].values, datapos, picker=5)[0]
+        plotdata[axkey].lines = lines
+        # cache the data of the lines for the interpolation in slider callbacks,
+        # sorted by the positions
+        plotdata[axkey].xdata = np.ascontiguousarray(
+            np.asarray(plotdata[axkey].values, dtype=float)[datapos_order]
+        )
+        plotdata[axkey].ydata = datapos_sorted
 
     # connect events
+    background = None
     if slider:
+        fig.canvas.mpl_connect("draw_event", _on_draw)
+        fig.canvas.mpl_connect("resize_event", _on_resize)
         slider_.on_changed(_update_slider)
         fig._slider = slider_  # to keep reference, otherwise slider is not responsive
     _set_yval(y0)
     
     return fig
+
+
+def _init_render_worker():
+    mpl.use("Agg")
+
+
+def _render_to_png(func: Callable, data: Any, kwargs: dict) -> bytes:
+    fig = func(data, **kwargs)
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def render_many(
+    datasets: Iterable,
+    func: Callable = parallel,
+    *,
+    n_jobs: int = None,
+    **kwargs,
+) -> List[bytes]:
+    """
+    Renders a plot for each dataset in separate processes and returns
+    the images as PNG encoded bytes. The workers are spawned, use the 'Agg'
+    backend and close every figure after it is saved, so only the encoded
+    images are kept in memory.
+
+    Since the workers are spawned, they import the main module of the calling
+    script. In a script, `render_many` must therefore be called under an
+    ``if __name__ == "__main__":`` guard, otherwise every worker runs the
+    script again and the workers fail to start.
+
+    Parameters
+    ----------
+    datasets: Iterable
+        The datasets to plot. Each item is passed as the first argument to `func`.
+    func: Callable, Optional
+        A pickleable plotting function that returns a figure, like
+        :func:`parallel` or :func:`aligned_parallel`. Default is :func:`parallel`.
+    n_jobs: int, Optional
+        The maximum number of worker processes. Default is None, which means
+        the number of processors on the machine.
+    **kwargs: dict, Optional
+        Extra keyword arguments are forwarded to `func` for every dataset.
+
+    Returns
+    -------
+    List[bytes]
+        The PNG images, in the order of the datasets.
+
+    Example
+    -------
+    >>> from sigmaepsilon.plotting.mpl import render_many
+    >>> if __name__ == "__main__":
+    ...     colors = np.random.rand(150, 3)
+    ...     labels = [str(i) for i in range(10)]
+    ...     datasets = [np.random.rand(10, 150) for _ in range(4)]
+    ...     images = render_many(datasets, labels=labels, colors=colors, n_jobs=2)
+    """
+    # the figures are always needed to render the images
+    kwargs.pop("return_figure", None)
+    # Forking is not safe after numba's threading layer or other libraries
+    # have started threads in the parent process, the workers are spawned.
+    with ProcessPoolExecutor(
+        max_workers=n_jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_render_worker,
+    ) as executor:
+        futures = [
+            executor.submit(_render_to_png, func, data, kwargs) for data in datasets
+        ]
+        return [future.result() for future in futures]
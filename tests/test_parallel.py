@@ -1,8 +1,10 @@
 import unittest
+from io import BytesIO
 import numpy as np
 
 from sigmaepsilon.core.testing import SigmaEpsilonTestCase
-from sigmaepsilon.plotting.mpl import parallel
+from sigmaepsilon.plotting.mpl import parallel, aligned_parallel, render_many
+from sigmaepsilon.plotting.mpl.parallel import _bezier_vertices, _interp1
 
 
 class TestParallel(SigmaEpsilonTestCase):
@@ -64,6 +66,84 @@ class TestParallel(SigmaEpsilonTestCase):
             return_figure=False,
             bezier=True
         )
+
+    def test_render_many(self):
+        colors = np.random.rand(150, 3)
+        labels = [str(i) for i in range(10)]
+        datasets = [np.random.rand(10, 150) for _ in range(3)]
+        images = render_many(
+            datasets,
+            labels=labels,
+            colors=colors,
+            n_jobs=2,
+        )
+        self.assertEqual(len(images), 3)
+        for image in images:
+            self.assertTrue(image.startswith(b"\x89PNG"))
+
+    def test_bezier_vertices(self):
+        N, nY = 20, 6
+        zs = np.random.rand(N, nY)
+        xs = np.linspace(0, nY - 1, nY * 3 - 2)
+        out = _bezier_vertices(zs, xs, np.empty((N, xs.size, 2)))
+        self.assertTrue(np.all(out[:, :, 0] == xs))
+        self.assertTrue(np.all(out[:, :, 1] == np.repeat(zs, 3, axis=1)[:, 1:-1]))
+
+    def test_interp1(self):
+        xs = np.sort(np.random.rand(50))
+        ys = np.random.rand(50)
+        y_below, y_above = xs[0] - 1.0, xs[-1] + 1.0
+        y_inside = 0.5 * (xs[10] + xs[11])
+        for y in [y_below, xs[0], y_inside, xs[25], xs[-1], y_above]:
+            self.assertAlmostEqual(_interp1(y, xs, ys), np.interp(y, xs, ys))
+
+
+class TestAlignedParallel(SigmaEpsilonTestCase):
+
+    def setUp(self):
+        self.labels = ["a", "b", "c"]
+        self.values = np.array([np.random.rand(150) for _ in self.labels]).T
+        self.datapos = np.linspace(-1, 1, 150)
+
+    def test_aligned_parallel_1(self):
+        aligned_parallel(self.values, self.datapos, labels=self.labels, yticks=[-1, 1])
+
+    def test_aligned_parallel_slider(self):
+        fig = aligned_parallel(
+            self.values,
+            self.datapos,
+            labels=self.labels,
+            yticks=[-1, 0, 1],
+            slider=True,
+        )
+        fig.canvas.draw()
+        fig._slider.set_val(0.25)
+        fig.savefig(BytesIO(), format="png")
+
+    def test_aligned_parallel_sharelimits(self):
+        fig = aligned_parallel(
+            self.values,
+            self.datapos,
+            labels=self.labels,
+            yticks=[-1, 1],
+            sharelimits=True,
+            hlines=[-0.5, 0.5],
+            vlines=[0.5],
+        )
+        fig.savefig(BytesIO(), format="png")
+
+    def test_aligned_parallel_unsorted_datapos(self):
+        order = np.random.permutation(len(self.datapos))
+        fig = aligned_parallel(
+            self.values[order],
+            self.datapos[order],
+            labels=self.labels,
+            yticks=[-1, 1],
+            y=0.3,
+        )
+        for i, ax in enumerate(fig.axes):
+            expected = np.interp(0.3, self.datapos, self.values[:, i])
+            self.assertAlmostEqual(ax.texts[0].get_position()[0], expected)
         
         
 if __name__ == "__main__":